@@ -1,79 +1,149 @@
 import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
 import os
 import re
 import json
-import time
+import html
+import threading
 
 
 # --- Configuration ---
-# Load API Key from .env file
+# Load API Key from .env file; Gemini itself is configured on first use in _get_analysis_model
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 
-# Stopwords set for filtering common words in highlighting
-STOPWORDS = {
+# Immutable stopwords set for filtering common words in highlighting
+STOPWORDS = frozenset({
     "the", "in", "with", "and", "or", "for", "to", "of", "a", "an", "is", "on",
     "by", "as", "at", "from", "that", "be", "are", "was", "were", "which", "this",
     "it", "has", "have", "will", "can", "should", "into", "but", "such", "their",
     "up", "over", "about", "not", "it's", "so", "if", "no", "etc"
+})
+
+
+# Precompiled patterns for whitespace cleanup and keyword tokenizing
+_WS_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+# Static instructions sent as the Gemini system prompt, kept separate from the per-request inputs
+ANALYSIS_INSTRUCTIONS = """
+You are a highly sophisticated ATS (Applicant Tracking System) scanner and a professional recruitment consultant.
+Your task is to analyze the provided resume against the job description and return a structured JSON object.
+
+Please provide the following analysis in a single JSON object with the specified keys:
+1.  "ats_score": An integer percentage (0-100) representing how well the resume matches the job description.
+2.  "missing_keywords": A JSON array of important keywords or skills from the job description that are missing in the resume.
+3.  "feedback": A concise, constructive summary providing actionable advice to improve the resume for this specific job.
+4.  "extracted_skills": A JSON array of skills found in the resume.
+5.  "contact_info": A JSON object containing "emails" (an array of strings) and "phone_numbers" (an array of strings) extracted from the resume.
+
+**Example JSON Output:**
+{
+    "ats_score": 85,
+    "missing_keywords": ["Project Management", "Agile Methodology", "Data Visualization"],
+    "feedback": "The resume is strong but could be improved by quantifying achievements in past roles and adding a project section that highlights experience with Agile methodologies.",
+    "extracted_skills": ["Python", "Streamlit", "Google Gemini API", "Regex"],
+    "contact_info": {
+        "emails": ["example.email@domain.com"],
+        "phone_numbers": ["+1234567890"]
+    }
+}
+
+Generate the JSON output for the job description and resume provided by the user.
+"""
+
+
+# Number of finished analyses kept in memory for repeat resume/job description pairs
+MAX_CACHED_ANALYSES = 32
+
+
+# Ask Gemini for a JSON response that follows the analysis schema directly
+ANALYSIS_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "ats_score": {"type": "integer"},
+            "missing_keywords": {"type": "array", "items": {"type": "string"}},
+            "feedback": {"type": "string"},
+            "extracted_skills": {"type": "array", "items": {"type": "string"}},
+            "contact_info": {
+                "type": "object",
+                "properties": {
+                    "emails": {"type": "array", "items": {"type": "string"}},
+                    "phone_numbers": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["emails", "phone_numbers"],
+            },
+        },
+        "required": ["ats_score", "missing_keywords", "feedback", "extracted_skills", "contact_info"],
+    },
 }
 
 
 # --- Core Functions ---
 
 
+class AnalysisParseError(Exception):
+    """Raised when the Gemini response text is not a valid analysis JSON object; holds the raw text."""
+
+
+@st.cache_data(show_spinner=False)
+def _extract_from_bytes(data: bytes) -> str:
+    """Parses PDF bytes held in memory. Cached on the bytes so repeat clicks skip parsing."""
+    import fitz  # PyMuPDF; imported on first upload so the UI renders without loading it
+
+    # Pages are read sequentially: PyMuPDF is not thread-safe and holds the GIL while extracting,
+    # so a thread pool would add overhead without any parallel speedup
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        parts = [page.get_text("text") for page in doc]
+    # Clean up excessive whitespace and newlines for better processing
+    return _WS_RE.sub(' ', " ".join(parts)).strip()
+
+
 def extract_resume_text(uploaded_file):
     """Extracts and cleans text from an uploaded PDF file."""
     try:
-        reader = PdfReader(uploaded_file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text() or ""
-            # Clean up excessive whitespace and newlines for better processing
-            page_text = re.sub(r'\s+', ' ', page_text).strip()
-            text += page_text + " "
-        return text.strip()
+        # getvalue() returns the full upload without touching the read position
+        return _extract_from_bytes(uploaded_file.getvalue())
     except Exception as e:
         st.error(f"Error reading PDF file: {e}")
         return None
 
 
-def extract_json_from_response(response_text):
+@st.cache_resource
+def _analysis_cache():
     """
-    Extracts the first valid JSON object found in the response text.
-    Handles code fences and text before/after JSON.
+    Process-wide store of finished analyses keyed by (resume_text, job_description).
+    Returns the dict with the lock that guards it, since every session thread shares it.
     """
-    # Remove code fences/backticks
-    cleaned = response_text.replace("``````", "").strip()
-    # Find the first { and last } and attempt to extract JSON block
-    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-    if match:
-        json_text = match.group(0)
-        try:
-            return json.loads(json_text)
-        except json.JSONDecodeError:
-            return None
-    return None
-
-
-def get_gemini_analysis(resume_text, job_description):
+    return {}, threading.Lock()
+
+
+@st.cache_resource
+def _get_analysis_model():
+    """
+    Builds the Gemini model once per process so its gRPC channel is reused across calls and reruns.
+    The SDK is imported and configured here rather than at startup, so the UI renders without loading it.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel('gemini-1.5-flash-latest', system_instruction=ANALYSIS_INSTRUCTIONS)
+
+
+def _run_gemini_analysis(resume_text, job_description, on_chunk=None):
     """
     Calls the Gemini API with a detailed prompt to get a structured JSON response.
     This single call handles ATS score, feedback, keyword analysis, and data extraction.
+    The response is streamed and `on_chunk(index)` is called as each chunk arrives.
+    An unparseable response raises AnalysisParseError with the raw text.
     """
-    model = genai.GenerativeModel('gemini-1.5-flash-latest')
+    model = _get_analysis_model()
 
-    # Enhanced prompt asking for a JSON output for reliable parsing
+    # Only the per-request inputs are sent as content; the instructions travel as the system prompt
     prompt = f"""
-    You are a highly sophisticated ATS (Applicant Tracking System) scanner and a professional recruitment consultant.
-    Your task is to analyze the provided resume against the job description and return a structured JSON object.
-
-    Analyze the following resume and job description:
-    
     **Job Description:**
     ---
     {job_description}
@@ -83,72 +153,202 @@ def get_gemini_analysis(resume_text, job_description):
     ---
     {resume_text}
     ---
-
-    Please provide the following analysis in a single JSON object with the specified keys:
-    1.  "ats_score": An integer percentage (0-100) representing how well the resume matches the job description.
-    2.  "missing_keywords": A JSON array of important keywords or skills from the job description that are missing in the resume.
-    3.  "feedback": A concise, constructive summary providing actionable advice to improve the resume for this specific job.
-    4.  "extracted_skills": A JSON array of skills found in the resume.
-    5.  "contact_info": A JSON object containing "emails" (an array of strings) and "phone_numbers" (an array of strings) extracted from the resume.
-
-    **Example JSON Output:**
-    {{
-        "ats_score": 85,
-        "missing_keywords": ["Project Management", "Agile Methodology", "Data Visualization"],
-        "feedback": "The resume is strong but could be improved by quantifying achievements in past roles and adding a project section that highlights experience with Agile methodologies.",
-        "extracted_skills": ["Python", "Streamlit", "Google Gemini API", "Regex"],
-        "contact_info": {{
-            "emails": ["example.email@domain.com"],
-            "phone_numbers": ["+1234567890"]
-        }}
-    }}
-    
-    Now, generate the JSON output for the provided resume and job description.
     """
 
+    response = model.generate_content(prompt, generation_config=ANALYSIS_GENERATION_CONFIG, stream=True)
+    parts = []
+    for i, chunk in enumerate(response):
+        # chunk.text raises on chunks without parts (e.g. an empty final chunk), so skip those
+        if chunk.parts:
+            parts.append(chunk.text)
+        if on_chunk:
+            on_chunk(i)
+    response_text = "".join(parts)
+
+    # JSON mode returns the bare object, so no code fences or surrounding text to strip
+    try:
+        analysis_result = json.loads(response_text)
+    except json.JSONDecodeError:
+        analysis_result = None
+    if not analysis_result:
+        raise AnalysisParseError(response_text)
+    return analysis_result
+
+
+def get_gemini_analysis(resume_text, job_description, on_chunk=None):
+    """
+    Returns the analysis for a resume/job description pair, reusing cached results for repeat pairs.
+    Only successful results are cached, so a failed call can be retried.
+    """
+    cache, lock = _analysis_cache()
+    key = (resume_text, job_description)
+    with lock:
+        if key in cache:
+            return cache[key]
     try:
-        response = model.generate_content(prompt)
-        # Extract JSON from possible extra text or code fence
-        analysis_result = extract_json_from_response(response.text)
-        if not analysis_result:
-            st.error(
-                "The AI response could not be parsed as valid JSON. "
-                "Please try again or check for any formatting issues."
-            )
-            st.info(f"Raw AI response (truncated):\n\n{response.text[:500]}")  # show beginning of AI response for debugging
-            return None
-        return analysis_result
+        analysis_result = _run_gemini_analysis(resume_text, job_description, on_chunk)
+    except AnalysisParseError as e:
+        st.error(
+            "The AI response could not be parsed as valid JSON. "
+            "Please try again or check for any formatting issues."
+        )
+        st.info(f"Raw AI response (truncated):\n\n{str(e)[:500]}")  # show beginning of AI response for debugging
+        return None
     except Exception as e:
         st.error(f"Unexpected error: {e}")
         return None
+    with lock:
+        if key not in cache and len(cache) >= MAX_CACHED_ANALYSES:
+            cache.pop(next(iter(cache)))  # evict the oldest entry
+        cache[key] = analysis_result
+    return analysis_result
+
+
+def get_gemini_analyses_batch(resumes, job_description, on_resume=None):
+    """
+    Analyzes several resumes against one job description.
+    `resumes` maps a unique key per upload to resume text; returns a dict of the same keys to analysis
+    (None on failure).
+    `on_resume(index)` is called after each resume is analyzed.
+    """
+    results = {}
+    for i, (key, resume_text) in enumerate(resumes.items()):
+        results[key] = get_gemini_analysis(resume_text, job_description)
+        if on_resume:
+            on_resume(i)
+    return results
 
 
 def get_keywords(job_description):
     """Extract keywords from job description filtering out stopwords and short words."""
-    words = set(re.findall(r'\b\w+\b', job_description.lower()))
-    filtered_keywords = {w for w in words if w not in STOPWORDS and len(w) > 2}
-    return filtered_keywords
+    # Single pass over the matches, without materializing an intermediate word list
+    return {
+        w for w in (m.group(0) for m in _WORD_RE.finditer(job_description.lower()))
+        if len(w) > 2 and w not in STOPWORDS
+    }
 
 
-def highlight_keywords(resume_text, job_description):
-    """Highlights important keywords from the job description found in the resume text."""
+def _trie_regex(words):
+    """
+    Builds a regex alternation with shared prefixes factored out, e.g. {"data", "database"} -> "data(?:base)?".
+    The engine then walks each prefix once instead of retrying every keyword at every position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end-of-word marker
+
+    # Emit node patterns bottom-up with an explicit stack; recursing once per character
+    # would hit the recursion limit on long runs of word characters (hashes, separator lines)
+    patterns = {}
+    stack = [(trie, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for char, child in node.items() if char)
+            continue
+        is_end = "" in node
+        branches = [re.escape(char) + patterns.pop(id(child)) for char, child in sorted(node.items()) if char]
+        if not branches:
+            patterns[id(node)] = ""
+            continue
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            # Optional tail is greedy, so the longest keyword wins
+            body = (body if len(branches) > 1 else "(?:" + body + ")") + "?"
+        patterns[id(node)] = body
+
+    return patterns[id(trie)]
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _compile_highlight_pattern(job_description):
+    """
+    Compiles the whole-word, case-insensitive highlight pattern for a job description's keywords.
+    Returns None when the job description has no keywords. Cached per job description across reruns.
+    """
     keywords = get_keywords(job_description)
     if not keywords:
-        return resume_text
+        return None
+    try:
+        return re.compile(r'\b(' + _trie_regex(keywords) + r')\b', flags=re.IGNORECASE)
+    except (RecursionError, re.error):
+        # Deeply nested groups (many keywords extending one another) can exceed the regex
+        # compiler's limits; fall back to a plain alternation, longest keywords first
+        alternation = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        return re.compile(r'\b(' + alternation + r')\b', flags=re.IGNORECASE)
 
-    # Build regex pattern to match whole keywords, case-insensitive
-    pattern = re.compile(r'\b(' + '|'.join(re.escape(k) for k in keywords) + r')\b', flags=re.IGNORECASE)
 
-    # Highlight matched keywords with HTML span
-    highlighted_text = pattern.sub(
-        lambda match: f"<span style='background-color: #FFF59D; color: #000000;'>{match.group(0)}</span>",
-        resume_text
-    )
-    return highlighted_text
+def highlight_keywords(resume_text, job_description):
+    """
+    Highlights important keywords from the job description found in the resume text.
+    Returns HTML in which all resume content is escaped, so it is safe to render as markup.
+    """
+    # Reuse the trie-shaped pattern when the same job description is highlighted again
+    pattern = _compile_highlight_pattern(job_description)
+    if pattern is None:
+        return html.escape(resume_text)
+
+    # Slice the text around each match and wrap matches in <mark>; styling comes from the page CSS
+    parts = []
+    last_end = 0
+    for match in pattern.finditer(resume_text):
+        parts.append(html.escape(resume_text[last_end:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        last_end = match.end()
+    parts.append(html.escape(resume_text[last_end:]))
+    return "".join(parts)
 
 
 # --- Streamlit UI ---
 
+def render_analysis_report(analysis_result):
+    """Renders the single-resume analysis report."""
+    # Read every field once up front; empty or null values fall back to defaults
+    score = analysis_result.get('ats_score') or 0
+    contact = analysis_result.get('contact_info') or {}
+    emails = contact.get('emails') or ["Not Found"]
+    phone_numbers = contact.get('phone_numbers') or ["Not Found"]
+    feedback = analysis_result.get('feedback') or "No feedback provided."
+    missing_keywords = analysis_result.get('missing_keywords') or []
+    extracted_skills = analysis_result.get('extracted_skills') or []
+
+    st.success("Analysis Complete")
+
+    st.subheader("Your Resume Analysis Report")
+
+    score_col, contact_col = st.columns(2)
+    with score_col:
+        st.metric(label="ATS Match Score", value=f"{score}%")
+    with contact_col:
+        st.write("Emails:", ", ".join(emails))
+        st.write("Phone Numbers:", ", ".join(phone_numbers))
+
+    st.markdown("---")
+
+    st.markdown("### Constructive Feedback")
+    st.info(feedback)
+
+    keywords_col, skills_col = st.columns(2)
+    with keywords_col:
+        st.markdown("Missing Keywords")
+        if missing_keywords:
+            for keyword in missing_keywords:
+                st.markdown(f"- {keyword}")
+        else:
+            st.write("No critical keywords are missing.")
+
+    with skills_col:
+        st.markdown("Skills Found in Resume")
+        if extracted_skills:
+            st.write(", ".join(extracted_skills))
+        else:
+            st.write("No specific skills section detected.")
+
+
 def main():
     st.set_page_config(page_title="ATS Resume Expert", layout="wide")
 
@@ -194,7 +394,9 @@ def main():
             }
 
             /* Highlight keyword background */
-            span {
+            mark {
+                background-color: #FFF59D;
+                color: #000000;
                 border-radius: 3px;
                 padding: 0 3px;
             }
@@ -242,6 +444,12 @@ def main():
     job_description = st.sidebar.text_area("Paste the Job Description Here", height=250, key="job_desc")
     uploaded_file = st.sidebar.file_uploader("Upload Your Resume (PDF)", type=["pdf"], key="resume_upload")
 
+    st.sidebar.header("Bulk Mode")
+    bulk_files = st.sidebar.file_uploader(
+        "Upload Multiple Resumes (PDF)", type=["pdf"], accept_multiple_files=True, key="bulk_upload"
+    )
+    bulk_button = st.sidebar.button("Analyze All Resumes", use_container_width=True)
+
     col1, col2 = st.columns([1, 1])
 
     with col1:
@@ -260,67 +468,99 @@ def main():
             if resume_text:
                 st.info("Resume parsed successfully. Contacting AI for analysis...")
 
-                # Progress bar animation
+                # Progress bar advances as streamed response chunks arrive
                 progress_bar = st.progress(0, text="Analyzing...")
 
-                analysis_result = get_gemini_analysis(resume_text, job_description)
-
-                for percent_complete in range(100):
-                    time.sleep(0.01)
-                    progress_bar.progress(percent_complete + 1, text="Finalizing report...")
+                # Repeat pairs are served from the analysis cache without calling Gemini
+                analysis_result = get_gemini_analysis(
+                    resume_text,
+                    job_description,
+                    on_chunk=lambda i: progress_bar.progress(min(99, (i + 1) * 5), text="Receiving report..."),
+                )
                 progress_bar.empty()
 
                 if analysis_result:
-                    st.success("Analysis Complete")
-
-                    st.subheader("Your Resume Analysis Report")
-
-                    score_col, contact_col = st.columns(2)
-                    with score_col:
-                        st.metric(label="ATS Match Score", value=f"{analysis_result.get('ats_score', 0)}%")
-                    with contact_col:
-                        contact = analysis_result.get('contact_info', {})
-                        st.write("Emails:", ", ".join(contact.get('emails', ["Not Found"])))
-                        st.write("Phone Numbers:", ", ".join(contact.get('phone_numbers', ["Not Found"])))
-
-                    st.markdown("---")
-
-                    st.markdown("### Constructive Feedback")
-                    st.info(analysis_result.get('feedback', "No feedback provided."))
-
-                    keywords_col, skills_col = st.columns(2)
-                    with keywords_col:
-                        st.markdown("Missing Keywords")
-                        missing_keywords = analysis_result.get('missing_keywords', [])
-                        if missing_keywords:
-                            for keyword in missing_keywords:
-                                st.markdown(f"- {keyword}")
-                        else:
-                            st.write("No critical keywords are missing.")
-
-                    with skills_col:
-                        st.markdown("Skills Found in Resume")
-                        extracted_skills = analysis_result.get('extracted_skills', [])
-                        if extracted_skills:
-                            st.write(", ".join(extracted_skills))
-                        else:
-                            st.write("No specific skills section detected.")
+                    st.session_state['analysis'] = analysis_result
+                    st.session_state['analysis_key'] = (hash(resume_text), hash(job_description))
                 else:
+                    st.session_state.pop('analysis', None)
+                    st.session_state.pop('analysis_key', None)
                     st.error(
                         "Unable to process resume analysis due to AI response format. "
                         "Please try again or use a different resume format."
                     )
 
+    # Keep showing the last report across reruns (e.g. Highlight clicks) while the inputs are unchanged
+    if 'analysis' in st.session_state and uploaded_file is not None and job_description.strip():
+        resume_text = extract_resume_text(uploaded_file)
+        if resume_text and st.session_state.get('analysis_key') == (hash(resume_text), hash(job_description)):
+            render_analysis_report(st.session_state['analysis'])
+
     if highlight_button:
         if uploaded_file is not None and job_description.strip():
             resume_text = extract_resume_text(uploaded_file)
             if resume_text:
                 st.subheader("Resume with Highlighted Keywords")
                 highlighted_text = highlight_keywords(resume_text, job_description)
-                st.markdown(highlighted_text, unsafe_allow_html=True)
+                # Raw HTML shell, so Streamlit skips the markdown parser on the full resume text
+                st.html(f"<div>{highlighted_text}</div>")
         else:
             st.warning("Please upload a resume and provide a job description to highlight keywords.")
 
+    if bulk_button:
+        if not bulk_files or not job_description.strip():
+            st.warning("Please upload one or more resumes and paste a job description to run bulk mode.")
+        else:
+            with st.spinner("Reading resumes..."):
+                # Key by upload position as well as name, so files sharing a name are all analyzed
+                resumes = {}
+                unreadable = []
+                for index, bulk_file in enumerate(bulk_files):
+                    resume_text = extract_resume_text(bulk_file)
+                    if resume_text:
+                        resumes[(index, bulk_file.name)] = resume_text
+                    else:
+                        # e.g. scanned or image-only PDFs with no extractable text
+                        unreadable.append((index, bulk_file.name))
+                names = [bulk_file.name for bulk_file in bulk_files]
+
+            results = {}
+            if resumes:
+                progress_bar = st.progress(0, text=f"Analyzing {len(resumes)} resumes...")
+                results = get_gemini_analyses_batch(
+                    resumes,
+                    job_description,
+                    on_resume=lambda i: progress_bar.progress(
+                        int((i + 1) * 100 / len(resumes)), text=f"Analyzed {i + 1} of {len(resumes)} resumes..."
+                    ),
+                )
+                progress_bar.empty()
+            else:
+                st.warning("None of the uploaded PDFs contain readable text, so there is nothing to analyze.")
+
+            def label(index, name):
+                # Repeated file names are labelled with their upload position
+                return f"{name} (#{index + 1})" if names.count(name) > 1 else name
+
+            st.subheader("Bulk Analysis Report")
+            rows = [
+                {
+                    "Resume": label(index, name),
+                    "ATS Match Score": (result.get('ats_score') or 0) if result else None,
+                    "Missing Keywords": (
+                        ", ".join(result.get('missing_keywords') or []) if result else "Analysis failed"
+                    ),
+                }
+                for (index, name), result in results.items()
+            ]
+            rows += [
+                {"Resume": label(index, name), "ATS Match Score": None, "Missing Keywords": "Unreadable PDF"}
+                for index, name in unreadable
+            ]
+            # Best matches first; failed and unreadable files last
+            rows.sort(key=lambda row: row["ATS Match Score"] if row["ATS Match Score"] is not None else -1, reverse=True)
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
 
 if __name__ == "__main__":
     main()